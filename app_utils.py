@@ -1,4 +1,7 @@
+import functools
 import re
+import string
+from pathlib import Path
 from typing import Iterable
 
 PROMPT_QA_MARKER = "# Prompt QA resolution"
@@ -17,6 +20,67 @@ PROMPT_QA_RULES = [
         ),
     }
 ]
+INJECTION_PHRASE_PATTERNS = [
+    r"\bignore (?:all|any|previous|earlier) instructions\b",
+    r"\bdisregard (?:all|any|previous|earlier) instructions\b",
+    r"\b(system prompt|developer message)\b",
+    r"\boverride (?:the )?system\b",
+    r"\bjailbreak\b",
+]
+# Scanned one pattern at a time: phrases overlap ("override system prompt"), and a single
+# alternation would report only the first of two overlapping hits.
+INJECTION_PHRASE_RES = [re.compile(pattern, re.IGNORECASE) for pattern in INJECTION_PHRASE_PATTERNS]
+PAGE_SPLIT_RE = re.compile(r"--- Page (\d+) ---")
+BLANK_LINE_RUN_RE = re.compile(r"\n{3,}")
+DUPLICATE_PAGE_MIN_CHARS = 200
+CHUNK_BREAK_SEPARATORS = ("\n\n", "\n", ". ")
+CITATION_RES = [
+    re.compile(r"---\s*Page\s+\d+\s*---"),
+    re.compile(r"\bPage\s+\d+"),
+]
+DIGEST_CITATION_RES = [
+    re.compile(r"\bPages?\s+\d"),
+    re.compile(r"\bCHUNK\s+\d"),
+    re.compile(r"\bChunk\s+\d"),
+]
+
+
+def find_injection_phrases(text: str) -> list[dict[str, object]]:
+    matches: list[dict[str, object]] = []
+    for pattern, pattern_re in zip(INJECTION_PHRASE_PATTERNS, INJECTION_PHRASE_RES):
+        for match in pattern_re.finditer(text):
+            start, end = match.span()
+            snippet_start = max(0, start - 40)
+            snippet_end = min(len(text), end + 40)
+            matches.append(
+                {
+                    "pattern": pattern,
+                    "start": start,
+                    "end": end,
+                    "match": match.group(0),
+                    "snippet": text[snippet_start:snippet_end],
+                }
+            )
+    return matches
+
+
+def redact_injection_spans(text: str, matches: list[dict[str, object]]) -> str:
+    if not matches:
+        return text
+    parts: list[str] = []
+    position = 0
+    for match in sorted(matches, key=lambda item: int(item["start"])):
+        start = int(match["start"])
+        end = int(match["end"])
+        if start < position:
+            # Overlapping phrases share one redaction marker.
+            position = max(position, end)
+            continue
+        parts.append(text[position:start])
+        parts.append("[REDACTED INJECTION PHRASE]")
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
 
 
 def apply_prompt_qa(prompt: str) -> str:
@@ -35,20 +99,93 @@ def apply_prompt_qa(prompt: str) -> str:
     return f"{prompt}\n\n{qa_block}"
 
 
+# Streamlit re-executes app.py on every rerun, so file caches live in this imported module.
+# Keying on the modification time picks up edits to the rubric or prompts without a restart.
+def read_text_file(path: Path) -> str:
+    return _read_text_file_cached(path, path.stat().st_mtime_ns)
+
+
+def read_prompt_file(path: Path) -> str:
+    return _read_prompt_file_cached(path, path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_text_file_cached(path: Path, mtime_ns: int) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+@functools.lru_cache(maxsize=32)
+def _read_prompt_file_cached(path: Path, mtime_ns: int) -> str:
+    return apply_prompt_qa(_read_text_file_cached(path, mtime_ns))
+
+
+@functools.lru_cache(maxsize=8)
+def compile_prompt_template(template: str) -> tuple[tuple[str, str | None], ...]:
+    """Split a str.format template into (literal, field name) pairs once per template."""
+    return tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(template))
+
+
+def fill_prompt_template(template: str, **values: str) -> str:
+    """Equivalent to template.format(**values) for plain {name} fields, without re-parsing."""
+    pieces: list[str] = []
+    for literal, field in compile_prompt_template(template):
+        pieces.append(literal)
+        if field is not None:
+            pieces.append(values[field])
+    return "".join(pieces)
+
+
 def split_pages(raw_text: str) -> list[tuple[int, str]]:
-    parts = re.split(r"--- Page (\d+) ---", raw_text)
+    markers = list(PAGE_SPLIT_RE.finditer(raw_text))
     pages: list[tuple[int, str]] = []
-    for index in range(1, len(parts), 2):
-        page_number = int(parts[index])
-        page_body = parts[index + 1].strip()
+    for index, marker in enumerate(markers):
+        body_end = markers[index + 1].start() if index + 1 < len(markers) else len(raw_text)
+        page_number = int(marker.group(1))
+        page_body = raw_text[marker.end() : body_end].strip()
         pages.append((page_number, f"--- Page {page_number} ---\n{page_body}"))
     return pages
 
 
+def condense_repeated_pages(raw_text: str) -> str:
+    """Collapse blank-line runs and replace repeated page bodies with a pointer to the first copy.
+
+    Page markers are kept so digest citations still resolve to the original page numbers.
+    """
+    pages = split_pages(raw_text)
+    if not pages:
+        return BLANK_LINE_RUN_RE.sub("\n\n", raw_text)
+    first_seen: dict[str, int] = {}
+    condensed: list[str] = []
+    for page_number, page_text in pages:
+        header, _, body = page_text.partition("\n")
+        body = BLANK_LINE_RUN_RE.sub("\n\n", body)
+        if len(body) >= DUPLICATE_PAGE_MIN_CHARS:
+            original = first_seen.setdefault(body, page_number)
+            if original != page_number:
+                body = f"[Same text as Page {original}]"
+        condensed.append(f"{header}\n{body}")
+    return "\n\n".join(condensed)
+
+
 def _chunk_text(text: str, max_chars: int) -> list[str]:
     if max_chars <= 0:
         return [text]
-    return [text[start : start + max_chars] for start in range(0, len(text), max_chars)]
+    chunks: list[str] = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        # Prefer ending on a paragraph, line or sentence break in the back half of the window
+        # so split pages keep whole sentences; fall back to a hard cut.
+        for separator in CHUNK_BREAK_SEPARATORS:
+            cut = text.rfind(separator, start + max_chars // 2, end)
+            if cut != -1:
+                end = cut + len(separator)
+                break
+        chunks.append(text[start:end])
+        start = end
+    if start < len(text):
+        chunks.append(text[start:])
+    return chunks
 
 
 def _chunk_oversized_page(page_number: int, page_text: str, target_chars: int) -> list[dict[str, object]]:
@@ -75,51 +212,39 @@ def chunk_pages(raw_text: str, target_chars: int) -> list[dict[str, object]]:
         return [{"start_page": None, "end_page": None, "text": raw_text}]
 
     chunks: list[dict[str, object]] = []
-    current_pages: list[tuple[int, str]] = []
+    text_buffer: list[str] = []
+    start_page = end_page = 0
     current_len = 0
 
     for page_number, page_text in pages:
         page_len = len(page_text)
-        if page_len > target_chars:
-            if current_pages:
-                start_page = current_pages[0][0]
-                end_page = current_pages[-1][0]
-                chunks.append(
-                    {
-                        "start_page": start_page,
-                        "end_page": end_page,
-                        "text": "\n\n".join(text for _, text in current_pages),
-                    }
-                )
-                current_pages = []
-                current_len = 0
-            chunks.extend(_chunk_oversized_page(page_number, page_text, target_chars))
-            continue
-
-        if current_pages and current_len + page_len > target_chars:
-            start_page = current_pages[0][0]
-            end_page = current_pages[-1][0]
+        if text_buffer and (page_len > target_chars or current_len + page_len > target_chars):
             chunks.append(
                 {
                     "start_page": start_page,
                     "end_page": end_page,
-                    "text": "\n\n".join(text for _, text in current_pages),
+                    "text": "\n\n".join(text_buffer),
                 }
             )
-            current_pages = []
+            text_buffer = []
             current_len = 0
 
-        current_pages.append((page_number, page_text))
+        if page_len > target_chars:
+            chunks.extend(_chunk_oversized_page(page_number, page_text, target_chars))
+            continue
+
+        if not text_buffer:
+            start_page = page_number
+        end_page = page_number
+        text_buffer.append(page_text)
         current_len += page_len
 
-    if current_pages:
-        start_page = current_pages[0][0]
-        end_page = current_pages[-1][0]
+    if text_buffer:
         chunks.append(
             {
                 "start_page": start_page,
                 "end_page": end_page,
-                "text": "\n\n".join(text for _, text in current_pages),
+                "text": "\n\n".join(text_buffer),
             }
         )
 
@@ -129,13 +254,8 @@ def chunk_pages(raw_text: str, target_chars: int) -> list[dict[str, object]]:
 def report_has_expected_citations(report: str, used_digest: bool) -> bool:
     if not report.strip():
         return True
-    patterns = [
-        r"---\s*Page\s+\d+\s*---",
-        r"\bPage\s+\d+",
-    ]
-    if used_digest:
-        patterns.extend([r"\bPages?\s+\d", r"\bCHUNK\s+\d", r"\bChunk\s+\d"])
-    return any(re.search(pattern, report) for pattern in patterns)
+    patterns = CITATION_RES + DIGEST_CITATION_RES if used_digest else CITATION_RES
+    return any(pattern.search(report) for pattern in patterns)
 
 
 def sample_evenly(items: Iterable[object], limit: int) -> list[object]:
@@ -1,14 +1,43 @@
+import hashlib
 import io
+import os
 import re
 from dataclasses import dataclass, replace
 from typing import Tuple
 
+from PIL import Image
 from pdf2image import convert_from_bytes
 from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError
 from pypdf import PdfReader
 from pypdf.errors import PdfReadError
 import pytesseract
-from pytesseract.pytesseract import TesseractError, TesseractNotFoundError
+from pytesseract.pytesseract import TesseractError, TesseractNotFoundError, file_to_dict
+
+from runtime_utils import ResponseCache, parse_positive_int, run_concurrently
+
+# Pages are OCR'd in parallel, so keep each Tesseract process single-threaded. This is process-wide
+# (pytesseract cannot pass an env to its subprocess); export OMP_THREAD_LIMIT to override.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+# Each worker holds a rendered page image in memory; more than a few rarely helps on shared hosts.
+OCR_DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+OCR_MAX_WORKERS = (
+    parse_positive_int(os.environ.get("OCR_MAX_WORKERS"), "OCR_MAX_WORKERS") or OCR_DEFAULT_MAX_WORKERS
+)
+# Pages are OCR'd at OCR_BASE_DPI; pages that come back sparse or low-confidence are re-rendered
+# at OCR_RETRY_DPI. Tesseract time scales with pixel count, so most pages take the cheaper pass.
+OCR_BASE_DPI = 150
+OCR_RETRY_DPI = 300
+OCR_RETRY_MIN_CHARS = 20
+OCR_RETRY_MIN_CONFIDENCE = 60.0
+OCR_CACHE_MAX_ENTRIES = 256  # pages; in memory only, shared across sessions
+
+# Re-uploads and re-runs with other settings render identical page images; skip re-OCR.
+OCR_RESULT_CACHE: ResponseCache[tuple[str, float | None]] = ResponseCache(OCR_CACHE_MAX_ENTRIES)
+
+HORIZONTAL_WHITESPACE_RE = re.compile(r"[ \t]+")
+VECTOR_OPERATOR_RE = re.compile(
+    rb"(?<![A-Za-z0-9])(?:m|l|re|c|v|y|h|S|s|f\*?|B\*?|b\*?|n)(?![A-Za-z0-9])"
+)
 
 
 @dataclass(frozen=True)
@@ -22,6 +51,53 @@ class PageExtractionDiagnostic:
     text_length: int
 
 
+@dataclass(frozen=True)
+class PageCoverageSummary:
+    total_pages: int
+    ocr_pages: tuple[int, ...]
+    no_text_pages: tuple[int, ...]
+    low_conf_pages: tuple[int, ...]
+    missing_conf_pages: tuple[int, ...]
+    image_pages: tuple[int, ...]
+    vector_pages: tuple[int, ...]
+
+
+def summarize_page_diagnostics(
+    diagnostics: list[PageExtractionDiagnostic],
+    low_confidence_threshold: float,
+) -> PageCoverageSummary:
+    """Group page numbers by coverage category in a single pass over the diagnostics."""
+    ocr_pages: list[int] = []
+    no_text_pages: list[int] = []
+    low_conf_pages: list[int] = []
+    missing_conf_pages: list[int] = []
+    image_pages: list[int] = []
+    vector_pages: list[int] = []
+    for diag in diagnostics:
+        page = diag.page_number
+        if diag.used_ocr:
+            ocr_pages.append(page)
+            if diag.ocr_confidence is None:
+                missing_conf_pages.append(page)
+            elif diag.ocr_confidence < low_confidence_threshold:
+                low_conf_pages.append(page)
+        elif not diag.has_text:
+            no_text_pages.append(page)
+        if diag.image_count > 0:
+            image_pages.append(page)
+        if diag.vector_count > 0:
+            vector_pages.append(page)
+    return PageCoverageSummary(
+        total_pages=len(diagnostics),
+        ocr_pages=tuple(ocr_pages),
+        no_text_pages=tuple(no_text_pages),
+        low_conf_pages=tuple(low_conf_pages),
+        missing_conf_pages=tuple(missing_conf_pages),
+        image_pages=tuple(image_pages),
+        vector_pages=tuple(vector_pages),
+    )
+
+
 @dataclass(frozen=True)
 class ExtractedVisual:
     page_number: int
@@ -66,51 +142,104 @@ def _format_tesseract_error(exc: Exception, language: str) -> str:
     return "Tesseract OCR failed. Check the OCR installation and try again."
 
 
-def ocr_pdf_page(
+def render_pdf_pages_for_ocr(
     file_bytes: bytes,
-    page_number: int,
-    language: str,
+    first_page: int,
+    last_page: int,
     pdf_password: str | None = None,
-) -> tuple[str, float | None]:
+    dpi: int = OCR_BASE_DPI,
+) -> list[Image.Image]:
     try:
-        images = convert_from_bytes(
+        # One call writes the PDF to a temp file once and renders the range with a pdftoppm
+        # process per page. Tesseract binarizes internally; gray is a third of the RGB data.
+        return convert_from_bytes(
             file_bytes,
-            first_page=page_number,
-            last_page=page_number,
+            dpi=dpi,
+            first_page=first_page,
+            last_page=last_page,
+            grayscale=True,
+            thread_count=last_page - first_page + 1,
             userpw=pdf_password,
         )
     except (PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError) as exc:
         raise PdfExtractionError(_format_pdf_render_error(exc)) from exc
-    if not images:
-        return "", None
-    image = images[0]
+
+
+def ocr_image(image: Image.Image, language: str) -> tuple[str, float | None]:
+    cache_key = ResponseCache.make_key(
+        language=language,
+        mode=image.mode,
+        size=image.size,
+        pixels=hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest(),
+    )
+    cached = OCR_RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
     try:
-        text = pytesseract.image_to_string(image, lang=language).strip()
+        # One tesseract run writes both the plain text and the TSV with word confidences.
+        text, tsv = pytesseract.run_and_get_multiple_output(
+            image,
+            extensions=["txt", "tsv"],
+            lang=language,
+        )
     except (TesseractNotFoundError, TesseractError) as exc:
         raise PdfExtractionError(_format_tesseract_error(exc, language)) from exc
+    text = text.strip()
     confidence = None
-    try:
-        data = pytesseract.image_to_data(image, lang=language, output_type=pytesseract.Output.DICT)
-        confidences: list[float] = []
-        for value in data.get("conf", []):
-            if isinstance(value, (int, float)):
+    data = file_to_dict(tsv, "\t", -1)
+    confidences: list[float] = []
+    for value in data.get("conf", []):
+        if isinstance(value, (int, float)):
+            parsed_value = float(value)
+        elif isinstance(value, str):
+            try:
                 parsed_value = float(value)
-            elif isinstance(value, str):
-                try:
-                    parsed_value = float(value)
-                except ValueError:
-                    continue
-            else:
+            except ValueError:
                 continue
-            if parsed_value >= 0:
-                confidences.append(parsed_value)
-        if confidences:
-            confidence = sum(confidences) / len(confidences)
-    except (TesseractNotFoundError, TesseractError):
-        confidence = None
+        else:
+            continue
+        if parsed_value >= 0:
+            confidences.append(parsed_value)
+    if confidences:
+        confidence = sum(confidences) / len(confidences)
+    OCR_RESULT_CACHE.set(cache_key, (text, confidence))
     return text, confidence
 
 
+def needs_ocr_retry(text: str, confidence: float | None) -> bool:
+    if len(text) < OCR_RETRY_MIN_CHARS:
+        return True
+    return confidence is not None and confidence < OCR_RETRY_MIN_CONFIDENCE
+
+
+def ocr_result_score(text: str, confidence: float | None) -> float:
+    """Confidence-weighted character count, used to pick the better of two OCR passes."""
+    return len(text) * (confidence or 0.0)
+
+
+def ocr_pdf_page(
+    file_bytes: bytes,
+    page_number: int,
+    language: str,
+    pdf_password: str | None = None,
+) -> tuple[str, float | None]:
+    images = render_pdf_pages_for_ocr(file_bytes, page_number, page_number, pdf_password)
+    if not images:
+        return "", None
+    return ocr_image(images[0], language)
+
+
+def group_page_runs(page_numbers: list[int], max_run: int) -> list[list[int]]:
+    """Split sorted page numbers into consecutive runs of at most max_run pages."""
+    runs: list[list[int]] = []
+    for page_number in page_numbers:
+        if runs and page_number == runs[-1][-1] + 1 and len(runs[-1]) < max_run:
+            runs[-1].append(page_number)
+        else:
+            runs.append([page_number])
+    return runs
+
+
 def count_page_images(page: object) -> int:
     try:
         images = page.images
@@ -186,10 +315,7 @@ def _collect_content_streams(page: object) -> list[bytes]:
 def _has_vector_operators(stream_data: bytes) -> bool:
     if not stream_data:
         return False
-    pattern = re.compile(
-        rb"(?<![A-Za-z0-9])(?:m|l|re|c|v|y|h|S|s|f\*?|B\*?|b\*?|n)(?![A-Za-z0-9])"
-    )
-    return bool(pattern.search(stream_data))
+    return bool(VECTOR_OPERATOR_RE.search(stream_data))
 
 
 def extract_vector_graphics(page: object, page_number: int) -> list[ExtractedVisual]:
@@ -253,31 +379,74 @@ def extract_vector_graphics(page: object, page_number: int) -> list[ExtractedVis
     return extracted
 
 
+def downscale_image_for_vision(
+    data: bytes,
+    image_format: str | None,
+    max_side: int,
+) -> tuple[bytes, str | None]:
+    """Shrink an image so its long edge is at most max_side; return it unchanged if already small."""
+    try:
+        image = Image.open(io.BytesIO(data))
+        if max(image.size) <= max_side:
+            return data, image_format
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        # Keep PNG for line art and page renders; photos compress far better as JPEG.
+        if (image_format or "").lower() == "png":
+            image.save(buffer, format="PNG", optimize=True)
+            return buffer.getvalue(), "png"
+        # JPEG has no alpha channel; flatten transparency onto white rather than black.
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            image = image.convert("RGBA")
+            flattened = Image.new("RGB", image.size, "white")
+            flattened.paste(image, mask=image.getchannel("A"))
+            image = flattened
+        image.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+        return buffer.getvalue(), "jpeg"
+    except Exception:
+        return data, image_format
+
+
 def render_pdf_page_image(
     file_bytes: bytes,
     page_number: int,
     dpi: int = 200,
     pdf_password: str | None = None,
 ) -> tuple[bytes | None, str | None]:
+    return render_pdf_page_images(file_bytes, page_number, page_number, dpi, pdf_password)[0]
+
+
+def render_pdf_page_images(
+    file_bytes: bytes,
+    first_page: int,
+    last_page: int,
+    dpi: int = 200,
+    pdf_password: str | None = None,
+) -> list[tuple[bytes | None, str | None]]:
+    """Rasterize a page range to PNG with one renderer call; failed pages come back as (None, None)."""
+    page_count = last_page - first_page + 1
     try:
         images = convert_from_bytes(
             file_bytes,
-            first_page=page_number,
-            last_page=page_number,
+            first_page=first_page,
+            last_page=last_page,
             dpi=dpi,
+            thread_count=page_count,
             userpw=pdf_password,
         )
     except Exception:
-        return None, None
-    if not images:
-        return None, None
-    image = images[0]
-    buffer = io.BytesIO()
-    try:
-        image.save(buffer, format="PNG")
-    except Exception:
-        return None, None
-    return buffer.getvalue(), "png"
+        return [(None, None)] * page_count
+    rendered: list[tuple[bytes | None, str | None]] = []
+    for image in images[:page_count]:
+        buffer = io.BytesIO()
+        try:
+            image.save(buffer, format="PNG")
+        except Exception:
+            rendered.append((None, None))
+        else:
+            rendered.append((buffer.getvalue(), "png"))
+    rendered.extend([(None, None)] * (page_count - len(rendered)))
+    return rendered
 
 
 def extract_pdf_text(
@@ -322,37 +491,69 @@ def extract_pdf_text(
                 )
 
     pages = len(reader.pages)
-    chunks = []
-    ocr_pages = 0
-    diagnostics: list[PageExtractionDiagnostic] = []
-    visuals: list[ExtractedVisual] = []
+    page_texts: list[tuple[int, str, int, int]] = []
+    page_visuals: list[tuple[list[ExtractedVisual], list[ExtractedVisual]]] = []
     for i, page in enumerate(reader.pages, start=1):
         page_images = extract_page_images(page, page_number=i)
-        image_count = len(page_images)
         page_vectors = extract_vector_graphics(page, page_number=i)
-        if page_vectors:
-            rasterized_data, rasterized_format = render_pdf_page_image(
-                file_bytes,
-                page_number=i,
-                pdf_password=pdf_password,
-            )
-            if rasterized_data:
-                page_vectors = [
-                    replace(
-                        visual,
-                        rasterized_data=rasterized_data,
-                        rasterized_format=rasterized_format,
-                    )
-                    for visual in page_vectors
-                ]
-        visuals.extend(page_images)
-        visuals.extend(page_vectors)
-        vector_count = len(page_vectors)
+        page_visuals.append((page_images, page_vectors))
         try:
             t = page.extract_text() or ""
         except Exception:
             t = ""
-        t = re.sub(r"[ \t]+", " ", t).strip()
+        t = HORIZONTAL_WHITESPACE_RE.sub(" ", t).strip()
+        page_texts.append((i, t, len(page_images), len(page_vectors)))
+
+    # Pages with vector graphics are rasterized in runs, like OCR pages, so each run
+    # costs one renderer call instead of one per page.
+    vector_page_numbers = [i for i, _, _, vector_count in page_texts if vector_count]
+    rasterized_pages: dict[int, tuple[bytes | None, str | None]] = {}
+    for run in group_page_runs(vector_page_numbers, max_run=OCR_MAX_WORKERS):
+        rasterized_pages.update(
+            zip(run, render_pdf_page_images(file_bytes, run[0], run[-1], pdf_password=pdf_password))
+        )
+
+    visuals: list[ExtractedVisual] = []
+    for i, (page_images, page_vectors) in enumerate(page_visuals, start=1):
+        rasterized_data, rasterized_format = rasterized_pages.get(i, (None, None))
+        if rasterized_data:
+            page_vectors = [
+                replace(
+                    visual,
+                    rasterized_data=rasterized_data,
+                    rasterized_format=rasterized_format,
+                )
+                for visual in page_vectors
+            ]
+        visuals.extend(page_images)
+        visuals.extend(page_vectors)
+
+    def ocr_page_image(image: Image.Image) -> tuple[str, float | None]:
+        return ocr_image(image, ocr_language)
+
+    # Text-layer extraction is done; OCR the remaining blank pages. Each run of consecutive
+    # pages is rendered by one convert_from_bytes call, then its pages are OCR'd in parallel.
+    # Runs are capped at the worker count so only one batch of page images is held at a time.
+    def ocr_page_runs(page_numbers: list[int], dpi: int) -> dict[int, tuple[str, float | None]]:
+        results: dict[int, tuple[str, float | None]] = {}
+        for run in group_page_runs(page_numbers, max_run=OCR_MAX_WORKERS):
+            images = render_pdf_pages_for_ocr(file_bytes, run[0], run[-1], pdf_password, dpi=dpi)
+            results.update(
+                zip(run, run_concurrently(ocr_page_image, images, max_workers=OCR_MAX_WORKERS))
+            )
+        return results
+
+    ocr_page_numbers = [i for i, t, _, _ in page_texts if not t] if use_ocr else []
+    ocr_results = ocr_page_runs(ocr_page_numbers, OCR_BASE_DPI)
+    retry_page_numbers = [i for i, result in ocr_results.items() if needs_ocr_retry(*result)]
+    for i, result in ocr_page_runs(retry_page_numbers, OCR_RETRY_DPI).items():
+        if ocr_result_score(*result) > ocr_result_score(*ocr_results[i]):
+            ocr_results[i] = result
+
+    chunks = []
+    ocr_pages = 0
+    diagnostics: list[PageExtractionDiagnostic] = []
+    for i, t, image_count, vector_count in page_texts:
         if t:
             chunks.append(f"\n\n--- Page {i} ---\n{t}")
             diagnostics.append(
@@ -367,18 +568,7 @@ def extract_pdf_text(
                 )
             )
         else:
-            ocr_text = ""
-            ocr_confidence = None
-            if use_ocr:
-                try:
-                    ocr_text, ocr_confidence = ocr_pdf_page(
-                        file_bytes,
-                        page_number=i,
-                        language=ocr_language,
-                        pdf_password=pdf_password,
-                    )
-                except PdfExtractionError:
-                    raise
+            ocr_text, ocr_confidence = ocr_results.get(i, ("", None))
             if ocr_text:
                 ocr_pages += 1
                 chunks.append(f"\n\n--- Page {i} ---\n[OCR]\n{ocr_text}")
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generic, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_positive_int(raw: str | None, name: str) -> int | None:
+    """Parse an optional positive-integer setting, warning and returning None when it is invalid."""
+    if raw is None or not raw.strip():
+        return None
+    try:
+        value = int(raw.strip())
+    except ValueError:
+        value = 0
+    if value <= 0:
+        logger.warning("Ignoring %s=%r: expected a positive integer.", name, raw)
+        return None
+    return value
+
+
+class RequestThrottle:
+    """Space out request starts across threads to stay under a requests-per-minute budget."""
+
+    def __init__(self, requests_per_minute: float) -> None:
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def run_concurrently(func: Callable[[T], R], items: Sequence[T], max_workers: int) -> list[R]:
+    """Apply func to each item on a thread pool and return results in input order.
+
+    The first failure is re-raised and any calls that have not started are cancelled.
+    """
+    if len(items) <= 1 or max_workers <= 1:
+        return [func(item) for item in items]
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = [executor.submit(func, item) for item in items]
+        return [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ResponseCache(Generic[T]):
+    """Thread-safe, size-bounded exact-match cache for model and OCR responses."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, T] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    @staticmethod
+    def make_key(**parts: object) -> str:
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> T | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            return value
+
+    @property
+    def hits(self) -> int:
+        with self._lock:
+            return self._hits
+
+    def set(self, key: str, value: T) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -7,12 +7,18 @@ from pypdf import PdfReader, PdfWriter
 from pypdf.generic import DictionaryObject, NameObject, StreamObject
 
 from pdf_utils import (
+    PageExtractionDiagnostic,
     PdfExtractionError,
     PdfPasswordRequiredError,
+    downscale_image_for_vision,
+    group_page_runs,
+    ocr_image,
     ocr_pdf_page,
     render_pdf_page_image,
     extract_pdf_text,
+    summarize_page_diagnostics,
 )
+from runtime_utils import ResponseCache
 
 
 def build_encrypted_pdf(password: str) -> bytes:
@@ -43,6 +49,13 @@ def add_text_page(writer: PdfWriter, text: str) -> None:
     page[NameObject("/Contents")] = content_ref
 
 
+def add_vector_page(writer: PdfWriter) -> None:
+    page = writer.add_blank_page(width=72, height=72)
+    content = StreamObject()
+    content._data = b"10 10 m 60 60 l S"
+    page[NameObject("/Contents")] = writer._add_object(content)
+
+
 def build_image_pdf() -> bytes:
     image = Image.new("RGB", (10, 10), color="red")
     buffer = io.BytesIO()
@@ -117,17 +130,32 @@ def test_ocr_pdf_page_passes_pdf_password_to_renderer(monkeypatch: pytest.Monkey
     calls = {}
 
     class FakeImage:
-        pass
+        mode = "L"
+        size = (2, 1)
+
+        def tobytes(self):
+            return b"\x00\xff"
 
     def fake_convert_from_bytes(*args, **kwargs):
         calls["userpw"] = kwargs.get("userpw")
+        calls["grayscale"] = kwargs.get("grayscale")
         return [FakeImage()]
 
     monkeypatch.setattr("pdf_utils.convert_from_bytes", fake_convert_from_bytes)
-    monkeypatch.setattr("pdf_utils.pytesseract.image_to_string", lambda *args, **kwargs: "OCR text")
+
+    def fake_run_and_get_multiple_output(image, extensions, lang=None):
+        calls["extensions"] = extensions
+        tsv = (
+            "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+            "1\t1\t0\t0\t0\t0\t0\t0\t100\t20\t-1\t\n"
+            "5\t1\t1\t1\t1\t1\t0\t0\t40\t20\t92\tOCR\n"
+            "5\t1\t1\t1\t1\t2\t50\t0\t40\t20\t88\ttext\n"
+        )
+        return ["OCR text\n", tsv]
+
     monkeypatch.setattr(
-        "pdf_utils.pytesseract.image_to_data",
-        lambda *args, **kwargs: {"conf": ["92", "88"]},
+        "pdf_utils.pytesseract.run_and_get_multiple_output",
+        fake_run_and_get_multiple_output,
     )
 
     text, confidence = ocr_pdf_page(
@@ -140,6 +168,8 @@ def test_ocr_pdf_page_passes_pdf_password_to_renderer(monkeypatch: pytest.Monkey
     assert text == "OCR text"
     assert confidence == 90
     assert calls["userpw"] == "secret"
+    assert calls["extensions"] == ["txt", "tsv"]
+    assert calls["grayscale"] is True
 
 
 def test_render_pdf_page_image_passes_pdf_password_to_renderer(
@@ -176,3 +206,197 @@ def test_ocr_pdf_page_surfaces_renderer_failures(monkeypatch: pytest.MonkeyPatch
 
     with pytest.raises(PdfExtractionError, match="Unable to render"):
         ocr_pdf_page(b"%PDF", page_number=1, language="eng")
+
+
+def test_summarize_page_diagnostics_groups_pages_by_category() -> None:
+    def diag(page_number, has_text, used_ocr, confidence=None, images=0, vectors=0):
+        return PageExtractionDiagnostic(
+            page_number=page_number,
+            has_text=has_text,
+            used_ocr=used_ocr,
+            ocr_confidence=confidence,
+            image_count=images,
+            vector_count=vectors,
+            text_length=0,
+        )
+
+    summary = summarize_page_diagnostics(
+        [
+            diag(1, True, False, vectors=1),
+            diag(2, False, True, confidence=45.0, images=1),
+            diag(3, False, True, confidence=None),
+            diag(4, False, True, confidence=90.0),
+            diag(5, False, False, images=2),
+        ],
+        low_confidence_threshold=60.0,
+    )
+
+    assert summary.total_pages == 5
+    assert summary.ocr_pages == (2, 3, 4)
+    assert summary.no_text_pages == (5,)
+    assert summary.low_conf_pages == (2,)
+    assert summary.missing_conf_pages == (3,)
+    assert summary.image_pages == (2, 5)
+    assert summary.vector_pages == (1,)
+
+
+def test_extract_pdf_text_ocrs_blank_pages_in_page_order(monkeypatch: pytest.MonkeyPatch) -> None:
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=72, height=72)
+    add_text_page(writer, "Typed page")
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    render_calls = []
+
+    def fake_render_pdf_pages_for_ocr(file_bytes, first_page, last_page, pdf_password=None, dpi=150):
+        render_calls.append((first_page, last_page))
+        return [f"image {page}" for page in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr("pdf_utils.OCR_MAX_WORKERS", 2)
+    monkeypatch.setattr("pdf_utils.render_pdf_pages_for_ocr", fake_render_pdf_pages_for_ocr)
+    monkeypatch.setattr(
+        "pdf_utils.ocr_image",
+        lambda image, language: (f"scanned page number {image.split()[-1]}", 80.0),
+    )
+
+    text, pages, ocr_pages, diagnostics, visuals = extract_pdf_text(
+        buffer.getvalue(),
+        use_ocr=True,
+        ocr_language="eng",
+    )
+
+    assert pages == 4
+    assert ocr_pages == 3
+    assert render_calls == [(1, 2), (3, 3)]
+    assert text.index("number 1") < text.index("number 2") < text.index("number 3")
+    assert [diag.used_ocr for diag in diagnostics] == [True, True, True, False]
+
+
+def test_extract_pdf_text_retries_sparse_ocr_pages_at_higher_dpi(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    writer = PdfWriter()
+    for _ in range(4):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    render_calls = []
+
+    def fake_render_pdf_pages_for_ocr(file_bytes, first_page, last_page, pdf_password=None, dpi=150):
+        render_calls.append((first_page, last_page, dpi))
+        return [(page, dpi) for page in range(first_page, last_page + 1)]
+
+    def fake_ocr_image(image, language):
+        page, dpi = image
+        if page == 2 and dpi == 150:
+            return "faint", 40.0
+        if page == 4:
+            return ("partly legible page four text", 55.0) if dpi == 150 else ("noise", 20.0)
+        return f"readable text on page {page} at {dpi}", 85.0
+
+    monkeypatch.setattr("pdf_utils.OCR_MAX_WORKERS", 4)
+    monkeypatch.setattr("pdf_utils.render_pdf_pages_for_ocr", fake_render_pdf_pages_for_ocr)
+    monkeypatch.setattr("pdf_utils.ocr_image", fake_ocr_image)
+
+    text, _, ocr_pages, diagnostics, _ = extract_pdf_text(
+        buffer.getvalue(),
+        use_ocr=True,
+        ocr_language="eng",
+    )
+
+    assert render_calls == [(1, 4, 150), (2, 2, 300), (4, 4, 300)]
+    assert ocr_pages == 4
+    assert "readable text on page 2 at 300" in text
+    assert "faint" not in text
+    assert "partly legible page four text" in text
+    assert "noise" not in text
+    assert diagnostics[1].ocr_confidence == 85.0
+
+
+def test_extract_pdf_text_rasterizes_vector_pages_in_runs(monkeypatch: pytest.MonkeyPatch) -> None:
+    writer = PdfWriter()
+    add_vector_page(writer)
+    add_vector_page(writer)
+    add_text_page(writer, "Typed page")
+    add_vector_page(writer)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    render_calls = []
+
+    def fake_render_pdf_page_images(file_bytes, first_page, last_page, dpi=200, pdf_password=None):
+        render_calls.append((first_page, last_page))
+        return [(f"png {page}".encode(), "png") for page in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr("pdf_utils.OCR_MAX_WORKERS", 4)
+    monkeypatch.setattr("pdf_utils.render_pdf_page_images", fake_render_pdf_page_images)
+
+    _, _, _, diagnostics, visuals = extract_pdf_text(
+        buffer.getvalue(),
+        use_ocr=False,
+        ocr_language="eng",
+    )
+
+    assert render_calls == [(1, 2), (4, 4)]
+    assert [visual.page_number for visual in visuals] == [1, 2, 4]
+    assert [visual.rasterized_data for visual in visuals] == [b"png 1", b"png 2", b"png 4"]
+    assert [diag.vector_count for diag in diagnostics] == [1, 1, 0, 1]
+
+
+def test_group_page_runs_splits_gaps_and_caps_run_length() -> None:
+    assert group_page_runs([1, 2, 3, 5, 6, 9], max_run=2) == [[1, 2], [3], [5, 6], [9]]
+    assert group_page_runs([], max_run=4) == []
+
+
+def test_downscale_image_for_vision_limits_long_edge() -> None:
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 100), color="blue").save(buffer, format="PNG")
+    data = buffer.getvalue()
+
+    small_data, small_format = downscale_image_for_vision(data, "png", max_side=800)
+    scaled_data, scaled_format = downscale_image_for_vision(data, "png", max_side=200)
+    jpeg_data, jpeg_format = downscale_image_for_vision(data, "jp2", max_side=200)
+
+    assert small_data is data
+    assert small_format == "png"
+    assert scaled_format == "png"
+    assert Image.open(io.BytesIO(scaled_data)).size == (200, 50)
+    assert jpeg_format == "jpeg"
+    assert Image.open(io.BytesIO(jpeg_data)).format == "JPEG"
+
+
+def test_downscale_image_for_vision_flattens_alpha_onto_white() -> None:
+    image = Image.new("RGBA", (400, 100), color=(0, 0, 0, 0))
+    image.paste((255, 0, 0, 255), (0, 0, 200, 100))
+    buffer = io.BytesIO()
+    image.save(buffer, format="TIFF")
+
+    scaled_data, scaled_format = downscale_image_for_vision(buffer.getvalue(), "tiff", max_side=200)
+
+    scaled = Image.open(io.BytesIO(scaled_data)).convert("RGB")
+    assert scaled_format == "jpeg"
+    assert all(channel > 240 for channel in scaled.getpixel((190, 25)))
+    red, green, blue = scaled.getpixel((10, 25))
+    assert red > 200 and green < 60 and blue < 60
+
+
+def test_ocr_image_reuses_result_for_identical_pixels(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = []
+
+    def fake_run_and_get_multiple_output(image, extensions, lang=None):
+        calls.append(lang)
+        return ["cached text", "level\tconf\ttext\n5\t70\tcached\n"]
+
+    monkeypatch.setattr(
+        "pdf_utils.pytesseract.run_and_get_multiple_output",
+        fake_run_and_get_multiple_output,
+    )
+    monkeypatch.setattr("pdf_utils.OCR_RESULT_CACHE", ResponseCache(max_entries=4))
+
+    first = ocr_image(Image.new("L", (8, 8), color=200), "eng")
+    second = ocr_image(Image.new("L", (8, 8), color=200), "eng")
+    other_language = ocr_image(Image.new("L", (8, 8), color=200), "deu")
+
+    assert first == second == ("cached text", 70.0)
+    assert other_language == first
+    assert calls == ["eng", "deu"]
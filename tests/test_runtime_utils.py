@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from runtime_utils import RequestThrottle, ResponseCache, parse_positive_int, run_concurrently
+
+
+def test_run_concurrently_preserves_input_order() -> None:
+    barrier = threading.Barrier(3)
+
+    def work(item: int) -> int:
+        barrier.wait(timeout=5)
+        return item * 10
+
+    assert run_concurrently(work, [3, 1, 2], max_workers=3) == [30, 10, 20]
+
+
+def test_run_concurrently_reraises_first_failure() -> None:
+    def work(item: int) -> int:
+        if item == 2:
+            raise ValueError("chunk failed")
+        return item
+
+    with pytest.raises(ValueError, match="chunk failed"):
+        run_concurrently(work, [1, 2, 3], max_workers=2)
+
+
+def test_request_throttle_spaces_request_starts(monkeypatch: pytest.MonkeyPatch) -> None:
+    clock = {"now": 100.0}
+    sleeps: list[float] = []
+
+    def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        clock["now"] += seconds
+
+    monkeypatch.setattr("runtime_utils.time.monotonic", lambda: clock["now"])
+    monkeypatch.setattr("runtime_utils.time.sleep", fake_sleep)
+
+    throttle = RequestThrottle(requests_per_minute=120)
+    for _ in range(3):
+        throttle.wait()
+
+    assert sleeps == [0.5, 0.5]
+
+
+def test_response_cache_evicts_least_recently_used_entry() -> None:
+    cache = ResponseCache(max_entries=2)
+    first = ResponseCache.make_key(model="m", user_input="one")
+    second = ResponseCache.make_key(model="m", user_input="two")
+    third = ResponseCache.make_key(model="m", user_input="three")
+
+    cache.set(first, "report one")
+    cache.set(second, "report two")
+    assert cache.get(first) == "report one"
+    cache.set(third, "report three")
+
+    assert cache.get(second) is None
+    assert cache.get(first) == "report one"
+    assert cache.get(third) == "report three"
+    assert len(cache) == 2
+    assert cache.hits == 3
+
+
+def test_parse_positive_int_falls_back_on_invalid_values(caplog: pytest.LogCaptureFixture) -> None:
+    assert parse_positive_int(" 500000 ", "BUDGET") == 500000
+    assert parse_positive_int(None, "BUDGET") is None
+    assert parse_positive_int("", "BUDGET") is None
+    assert not caplog.records
+
+    assert parse_positive_int("800k", "BUDGET") is None
+    assert parse_positive_int("0", "BUDGET") is None
+    assert parse_positive_int("-5", "BUDGET") is None
+    assert len(caplog.records) == 3
+    assert all("BUDGET" in record.getMessage() for record in caplog.records)